@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+###############################################################################
+#                       BENCHMARK PARSE
+#
+# Purpose:
+#    To measure the throughput and memory use of the target list parser on
+#    large, synthetic target list pages.
+# Author:
+#    Rachel Street @ LCOGT
+###############################################################################
+
+###############################
+# IMPORTED MODULES
+from sys import argv
+import time
+import tracemalloc
+import get_spitzer_mulens_targets
+
+###############################
+# DECLARED STATEMENTS
+help_text = '''                     BENCHMARK PARSE
+
+This script times the parsing of a synthetic target list page, in the format
+returned by the online portal, and reports the peak memory allocated while
+parsing it.
+
+Operation:
+    From the commandline, type:
+    > python3 benchmark_parse.py [options]
+
+Inputs (all optional):
+   -help      Displays this help text
+   -targets [N]  Number of target rows in the synthetic page, Default: 20000
+   -repeats [N]  Number of timed parses, Default: 5
+   -bad-rows [N]  Number of target rows to corrupt, which the parser should quarantine, Default: 0
+   -page-out [file-path]  Also writes the synthetic page to this file, so that the same
+              page can be fed to other versions of the parser for comparison.
+'''
+
+#################################
+# MAKE TEST PAGE
+def make_test_page(n_targets, n_bad_rows=0):
+    '''Function to return the bytes of a synthetic target list page with n_targets rows,
+    laid out as by the online portal.  Of these rows, n_bad_rows are corrupted, spread
+    evenly through the table, alternately by truncating them and by replacing a
+    numerical value.'''
+
+    lines = [ b'<html><body>',
+              b'<table><tr><td>Page navigation</td></tr></table>',
+              b'<!-- >>>>START TARGET LIST -->',
+              b'<table border="1">',
+              b'<tr><th>Name</th><th colspan="2">Position</th><th colspan="3">Survey model</th>' + \
+                b'<th>m<sub>last</sub></th><th>Observers</th></tr>',
+              b'<tr><td></td><td>RA</td><td>Dec</td><td>recommended cadence</td></tr>' ]
+    bad_rows = set([ (k * n_targets) // n_bad_rows for k in range(0,n_bad_rows,1) ]) if n_bad_rows > 0 else set()
+    for i in range(0,n_targets,1):
+        short_name = ('OB16%04i' % (i % 10000)) if i < 10000 else ('KB16%04i' % (i % 10000))
+        row = '<tr><td><a href="event_page.cgi?event=' + short_name + '">' + short_name + '</a></td>' + \
+              '<td>17:51:%05.2f</td><td>-29:53:%04.1f</td>' % (i % 60, i % 60) + \
+              '<td>%.2f</td><td>%.3f</td><td>%.1f</td>' % (1.0 + i % 7, 7500.0 + i % 100, 10.0 + i % 30) + \
+              '<td>%.2f</td><td>%.2f</td><td>%.2f</td><td>%.1f</td>' % (15.0 + i % 5, 0.5, 16.0, 4.0) + \
+              '<td><b>high</b></td><td>low</td><td>2</td><td>LCOGT<br>uFUN</td></tr>'
+        if i in bad_rows:
+            if len(bad_rows) % 2 == 0: row = row[0:row.index('</td>')+5] + '</tr>'
+            else: row = row.replace('<td>0.50</td>','<td>n/a</td>')
+            bad_rows.discard(i)
+        lines.append(row.encode('ascii'))
+        if i % 100 == 0: lines.append(b'<tr><td><img src="lightcurve.png"></td></tr>')
+    lines = lines + [ b'</table>', b'<!-- <<<<END TARGET LIST -->', b'</body></html>', b'' ]
+
+    return b'\n'.join(lines)
+
+#################################
+# TIME PARSE
+def time_parse(page_html, repeats):
+    '''Function to parse a page repeatedly, quarantining any malformed rows, and return
+    the number of targets found, the number of rows quarantined, the best wall-clock 
+    time in seconds and the peak memory allocated in bytes'''
+
+    best = None
+    for i in range(0,repeats,1):
+        t0 = time.perf_counter()
+        targets = get_spitzer_mulens_targets.parse_target_list_html(page_html, quarantine=[])
+        dt = time.perf_counter() - t0
+        if best == None or dt < best: best = dt
+
+    tracemalloc.start()
+    quarantine = []
+    targets = get_spitzer_mulens_targets.parse_target_list_html(page_html, quarantine=quarantine)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return len(targets), len(quarantine), best, peak
+
+#################################
+# COMMANDLINE RUN SECTION
+if __name__ == '__main__':
+
+    if '-help' in argv:
+        print(help_text)
+        exit()
+
+    options = { '-targets': 20000, '-repeats': 5, '-bad-rows': 0, '-page-out': None }
+    for flag in options.keys():
+        if flag in argv:
+            try: value = argv[argv.index(flag)+1]
+            except IndexError:
+                print('ERROR: missing value for ' + flag + ' in argument list')
+                exit()
+            if flag == '-page-out': options[flag] = value
+            else: options[flag] = int(value)
+    if options['-repeats'] < 1:
+        print('ERROR: -repeats must be at least 1')
+        exit()
+
+    page_html = make_test_page(options['-targets'], options['-bad-rows'])
+    if options['-page-out'] != None:
+        fileobj = open(options['-page-out'],'wb')
+        fileobj.write(page_html)
+        fileobj.close()
+
+    (n_targets, n_bad, best, peak) = time_parse(page_html, options['-repeats'])
+    print('# Page size[kB]  N targets  N quarantined  best[ms]  rows/s  peak memory[kB]')
+    print(' %13.1f  %9i  %13i  %8.1f  %6.0f  %15.1f' % (len(page_html)/1024.0, n_targets, n_bad, \
+                                                   best*1000.0, (n_targets+n_bad)/best, peak/1024.0))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+###############################################################################
+#                       BENCHMARK STARTUP
+#
+# Purpose:
+#    To measure the interpreter startup and import cost of the commandline
+#    tools, and to check that lightweight runs do not load the HTTP stack.
+# Author:
+#    Rachel Street @ LCOGT
+###############################################################################
+
+###############################
+# IMPORTED MODULES
+from os import path
+from sys import argv, executable, version_info
+import os
+import subprocess
+import tempfile
+import time
+
+###############################
+# DECLARED STATEMENTS
+help_text = '''                     BENCHMARK STARTUP
+
+This script times the startup of the toolkit's commandline entry points, in the
+style of python -X importtime, so that import-time regressions can be tracked.
+
+Operation:
+    From the commandline, type:
+    > python benchmark_startup.py [options]
+
+Inputs (all optional):
+   -help      Displays this help text
+   -repeats [N]  Number of timed runs of each command, Default: 10
+   -importtime   Also prints the per-module -X importtime breakdown (Python 3.7+ only)
+
+Output:
+   The best and median wall-clock time for each command, including a history-only
+   read of a small temporary -history file with -offline, followed by a list of the
+   network (and other slow-loading) modules loaded by importing each tool.  Any such 
+   module loaded on a lightweight path is flagged as a regression.
+'''
+
+# Modules which should only be loaded by runs which contact the portal.  This includes
+# json, which only the session cache needs and which is slow to import:
+network_modules = [ 'urllib', 'urllib2', 'urllib.request', 'httplib', 'http.client', \
+                    'cookielib', 'http.cookiejar', 'getpass', 'socket', 'ssl', 'json' ]
+
+# Rows written to the temporary history file for the timed history-only read:
+history_rows = [ ' OB160001 17:51:40.00 -29:53:40.0 5.0 7500.000 20.0 15.0 0.5 16.0 4.0 high low 2 LCOGT:uFUN',
+                 ' OB160002 17:51:41.00 -29:53:41.0 6.0 7501.000 21.0 16.0 0.5 16.0 4.0 high low 2 LCOGT:uFUN' ]
+
+# Tool modules whose import should stay free of network modules:
+tool_modules = [ 'get_spitzer_mulens_targets', 'update_observer_list', 'target_class', 'session_cache' ]
+
+#################################
+# TIME COMMAND
+def time_command(cmd, repeats):
+    '''Function to run a command repeatedly and return the best and median wall-clock
+    times in milliseconds'''
+
+    timings = []
+    for i in range(0,repeats,1):
+        t0 = time.time()
+        subprocess.call(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append( (time.time() - t0) * 1000.0 )
+    timings.sort()
+
+    return timings[0], timings[len(timings)//2]
+
+#################################
+# LOADED NETWORK MODULES
+def loaded_network_modules(module_name):
+    '''Function to import a tool module in a clean interpreter and return the list of
+    network modules that the import pulled in'''
+
+    code = 'import sys; import ' + module_name + '; ' + \
+           'print(" ".join([m for m in ' + repr(network_modules) + ' if m in sys.modules]))'
+    output = subprocess.Popen([executable, '-c', code], stdout=subprocess.PIPE, \
+                              cwd=path.dirname(path.abspath(__file__))).communicate()[0]
+
+    return output.decode().split()
+
+#################################
+# IMPORT TIME BREAKDOWN
+def import_time_breakdown(module_name):
+    '''Function to return the -X importtime output for a tool module, sorted by
+    cumulative import time'''
+
+    if version_info < (3,7): return []
+
+    cmd = [ executable, '-X', 'importtime', '-c', 'import ' + module_name ]
+    output = subprocess.Popen(cmd, stderr=subprocess.PIPE, \
+                              cwd=path.dirname(path.abspath(__file__))).communicate()[1]
+    lines = [ line for line in output.decode().split('\n') if line.startswith('import time:') ]
+    entries = []
+    for line in lines[1:]:
+        fields = line.replace('import time:','').split('|')
+        entries.append( (int(fields[1]), fields[2].rstrip()) )
+    entries.sort(reverse=True)
+
+    return entries
+
+#################################
+# COMMANDLINE RUN SECTION
+if __name__ == '__main__':
+
+    if '-help' in argv:
+        print(help_text)
+        exit()
+
+    repeats = 10
+    if '-repeats' in argv:
+        try: repeats = int(argv[argv.index('-repeats')+1])
+        except (IndexError, ValueError):
+            print('ERROR: missing or invalid number of repeats in argument list')
+            exit()
+    if repeats < 1:
+        print('ERROR: -repeats must be at least 1')
+        exit()
+
+    # The history-only read uses a temporary history file, which is left unchanged
+    # by an -offline run and removed afterwards:
+    (fd, history_file) = tempfile.mkstemp(suffix='.txt')
+    fileobj = os.fdopen(fd,'w')
+    fileobj.write('\n'.join(history_rows) + '\n')
+    fileobj.close()
+
+    tool_dir = path.dirname(path.abspath(__file__))
+    commands = [ ('interpreter', [ executable, '-c', 'pass' ]),
+                 ('get_spitzer_mulens_targets -version', \
+                    [ executable, path.join(tool_dir,'get_spitzer_mulens_targets.py'), '-version' ]),
+                 ('get_spitzer_mulens_targets -offline', \
+                    [ executable, path.join(tool_dir,'get_spitzer_mulens_targets.py'), \
+                      '-offline', '-history', history_file ]),
+                 ('update_observer_list -version', \
+                    [ executable, path.join(tool_dir,'update_observer_list.py'), '-version' ]) ]
+
+    print('# Command                                  best[ms]  median[ms]')
+    try:
+        for (label, cmd) in commands:
+            (best, median) = time_command(cmd, repeats)
+            print(' %-40s %8.1f  %10.1f' % (label, best, median))
+    finally:
+        os.remove(history_file)
+
+    print('# Module                          network/slow modules loaded on import')
+    regression = False
+    for module_name in tool_modules:
+        loaded = loaded_network_modules(module_name)
+        if len(loaded) > 0: regression = True
+        print(' %-32s %s' % (module_name, ' '.join(loaded) if len(loaded) > 0 else 'none'))
+    if regression: print('WARNING: network modules loaded on the lightweight import path')
+
+    if '-importtime' in argv:
+        for module_name in tool_modules:
+            print('# Cumulative import time [us] for ' + module_name)
+            for (cumulative, name) in import_time_breakdown(module_name)[0:10]:
+                print(' %10i %s' % (cumulative, name))
@@ -1,6 +1,6 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 ###############################################################################
-#     	      	      	GET SPITZER MICROLENSING TARGETS
+#                       GET SPITZER MICROLENSING TARGETS
 #
 # Purpose:
 #    To submit and update targets for the Spizter Microlensing program to the 
@@ -11,13 +11,13 @@
 
 ###############################
 # IMPORTED MODULES
+# Network and prompting modules (urllib.request, getpass) are imported only
+# where they are used, so that help, version and history-only runs never load
+# the HTTP stack:
 from os import path
 from sys import argv
-from urllib import urlencode
-import urllib2
-import cookielib
-import getpass
 import target_class
+import session_cache
 
 ###############################
 # DECLARED STATEMENTS
@@ -29,17 +29,28 @@ coordination system.
 
 Operation:
     From the commandline, type:
-    > python get_spitzer_mulens_targets.py [options] 
+    > python3 get_spitzer_mulens_targets.py [options] 
 
 Inputs (all optional): 
    -help      Displays this help text
    -version   Displays the version string
    -file [path-to-input-file] Requires a second argument giving a path to the output file to be written.
    -user [ID] -pass [code]  Requires both -user and -pass arguments to be given, followed by
-              the respective access codes.  These will be prompted for if not given. 
+              the respective access codes.  If not given, these are read from the 
+              SPITZER_MULENS_USER and SPITZER_MULENS_PASSWORD environment variables or the 
+              credential cache, and are only prompted for when run from a terminal. 
+   -save-credentials  Records the access codes in the credential cache, readable only by the
+              user, so that later runs need not give them.  Note that the password is stored as 
+              plain text (JSON), protected only by the file permissions, as for a .netrc file. 
+              Cached credentials expire after 30 days, or when the portal rejects them. 
+   -cache-dir [dir-path]  Directory of the credential and session cache, Default: ~/.spitzer_mulens
+              An authenticated session is re-used from the cache for up to 8 hours. 
    -targets-only  Returns only the target dictionary, no other output. 
    -history  [file-path]  Records any successful targetlist query to local disk.  This file will be
                overwritten by subsequent successful queries, but will be read back if a query fails.  
+   -offline   Reads the target list from the -history file only, without querying the portal. 
+   -quarantine [file-path]  Writes any malformed rows of the target list, which are skipped, to
+              this file together with a diagnostic for each. 
 
 Modes:
    This program queries the online Spitzer Microlensing portal for the up-to-date target list.
@@ -49,9 +60,13 @@ Modes:
    If the -history flag is used, the target list output will be the online targetlist if it can be
    queried successfully.  If for some reason this is unavailable, the data in the given file will be
    returned as a fallback.  Any successful online query will cause this file to be updated.  
+   If the -offline flag is used as well, the history file is read directly and no connection is
+   made to the portal.  
+   Rows of the target list which cannot be parsed are skipped, with a warning, so that one broken
+   entry does not cost the rest of the list.  The -quarantine flag records these rows to file.  
 '''
 
-version = 'get_spitzer_mulens_targets_v1.2'
+version = 'get_spitzer_mulens_targets_v2.2'
 
 #################################
 # FUNCTION REQUEST TARGET LIST
@@ -64,15 +79,25 @@ def request_target_list(params):
                'password': <given or prompted for>,
                'output_file': <file path, None, optional>,
                'history': <file path, None, optional>,
-	       'targets-only': {True,False, Default: False} }
+               'targets-only': {True,False, Default: False},
+               'offline': {True,False, Default: False},
+               'save-credentials': {True,False, Default: False},
+               'cache_dir': <directory path, None to disable, Default: ~/.spitzer_mulens>,
+               'quarantine': <file path, None, optional> }
     
     If calling this function from another Python code, setting targets-only=True will 
     suppress all other screen or file output and return only the dictionary of targets of the
     form:
     targets = { target_name1: target_object1, 
                 target_name2: target_object2, ...
-	      }
+              }
     Each object is an instance of the MulensTarget class. 
+    Malformed rows in the target list are skipped and reported in user_info, and, if a 
+    quarantine file is given, written to it with a diagnostic for each row. 
+    Setting offline=True reads the targets from the history file only, without
+    prompting for credentials or contacting the portal. 
+    Credentials not given are looked up as described in session_cache.get_credentials, 
+    and are never prompted for unless the program is run from a terminal. 
     The function also returns the list user_info, which contains a list of information and/or error
     messages in the sequence they occurred.  
     '''
@@ -80,99 +105,146 @@ def request_target_list(params):
     # Initialize targets dictionary and message, returned in all cases:
     targets = {}
     user_info = []
+    quarantine = []
         
-    # Compose authentication details if not already available:
-    if params['userID'] == None: params['userID'] = raw_input('Username: ')
-    if params['password'] == None: params['password'] = getpass.getpass('Password: ')
-    values = { 'username' : params['userID'], 'password': params['password'] }
-    data = urlencode(values)
+    # In offline mode, skip the portal query entirely and treat it as unsuccessful,
+    # so that the history file is read below:
+    if params.get('offline',False) == True:
+        valid_targets = False
     
-    # First attempt to harvest the targetlist from the online portal. 
-    (targets, user_info, valid_targets) = fetch_online_targetlist(targets, user_info, params)
+    else:
+        # Compose authentication details if not already available:
+        (user_info, valid_targets) = session_cache.get_credentials(params, user_info)
     
-    # If the online query was unsuccessful, and the history option is not set, return
-    # empty handed:
-    if valid_targets == False and params['history'] == None:
-        return targets, user_info
+        # First attempt to harvest the targetlist from the online portal. 
+        if valid_targets == True:
+            (targets, user_info, valid_targets, quarantine) = fetch_online_targetlist(targets, user_info, params)
     
     # If the online query was unsuccessful, and the history option is set, attempt to read
-    # the targetlist from local disk:
+    # the targetlist from local disk.  The history file is then left as it is, so that 
+    # any rows which could not be read from it are not lost.  If the history option is 
+    # not set, the function returns empty handed:
+    from_history = False
+    history_quarantine = []
     if valid_targets == False and params['history'] != None:
-        (targets, user_info, valid_targets) = read_local_target_list(targets,user_info,params)
-	
+        (targets, user_info, valid_targets) = read_local_target_list(targets,user_info,params,\
+                                                                        quarantine=history_quarantine)
+        from_history = True
+    
+    # Record the malformed rows from both sources to the quarantine file at once, 
+    # so that neither overwrites the other, and no file from an earlier run is left behind:
+    if params.get('quarantine') != None:
+        user_info = output_quarantine(quarantine + history_quarantine, params['quarantine'], user_info)
+        
     # Output the returned data according to user instructions:
     if valid_targets == True:
         if params['output_file'] == None and params['targets-only'] == False:
-            for target_name,target in targets.items(): print target.summary()
+            for target_name,target in targets.items(): print(target.summary())
         if params['output_file'] != None: output_local_target_list(targets,params['output_file'])
-        if params['history'] != None: output_local_target_list(targets,params['history'])
+        if params['history'] != None and from_history == False: 
+            kept_lines = read_history_entries(quarantine, targets, params['history'])
+            output_local_target_list(targets,params['history'],kept_lines=kept_lines)
     
     return targets, user_info
 
 #################################
 # FETCH ONLINE TARGETLIST
 def fetch_online_targetlist(targets, user_info, params):
-    '''Function to harvest the target list from the online portal'''
+    '''Function to harvest the target list from the online portal.  As well as the targets,
+    user_info and a status flag, this returns the list of any malformed rows which were
+    set aside, as described in quarantine_row.'''
     
-    # Status flag, indicates success or failure of online query:
-    status = True
+    # Deferred imports, so that only runs which query the portal load the HTTP stack:
+    import urllib.request
+    import urllib.error
     
     # URL of submission page:
     url = 'http://robonet.lcogt.net/cgi-bin/private/cgiwrap/robouser/spitzer_target_list.cgi'
 
-    # Build the password manager.  Yes, this uses urllib2 rather than requests
-    # This is to make the code as portable as possible for users for whom
-    # requests isn't yet part of their system python, and to avoid having 
-    # any dependencies if possible:
-    pswd_mgr = urllib2.HTTPPasswordMgrWithDefaultRealm()
-    pswd_mgr.add_password(None, url, params['userID'], params['password'])
-    handler = urllib2.HTTPBasicAuthHandler(pswd_mgr)
-    opener = urllib2.build_opener(handler)
-    
-    # Install the opener:
-    urllib2.install_opener(opener)
-    try: response = opener.open(url)
-    except urllib2.HTTPError, error:
-        user_info.append('Problem logging into Spitzer microlensing observing portal: ' + error.reason)
-	status = False
-	return targets, user_info, status
-    user_info.append('Logged into Spitzer microlensing observing portal as '+str(params['userID']))
-    
-    # Compose the request to the target server - no parameters are required:
-    url_params = { }
-    data = urlencode(url_params)
-	
+    # Log in, or re-use a cached session.  Status flag indicates success or failure:
+    quarantine = []
+    (opener, cookie_jar, user_info, status) = session_cache.open_session(url, params, user_info)
+    if status == False:
+        return targets, user_info, status, quarantine
+    
+    # Compose the request to the target server - no parameters are required,
+    # but an (empty) body keeps this a POST request:
+    data = b''
+        
     # Send the request to the online system and harvest the response:
-    req = urllib2.Request(url,data)
-    try: response = urllib2.urlopen(req)
-    except urllib2.HTTPError, error:
-        user_info.append('Problem fetching data from Spitzer microlensing observing portal: ' + error.reason)
-	status = False
-	return targets, user_info, status
-    page_html = response.readlines()
-    
-    # Extract the ASCII target information from the returned page: 
-    targets = parse_target_list_html(page_html)
+    req = urllib.request.Request(url,data)
+    try: response = urllib.request.urlopen(req)
+    except urllib.error.HTTPError as error:
+        user_info.append('Problem fetching data from Spitzer microlensing observing portal: ' + str(error.reason))
+        if error.code == 401: user_info = session_cache.reject_credentials(params, user_info)
+        status = False
+        return targets, user_info, status, quarantine
+    # The page is kept as the raw bytes of the response buffer; it is only
+    # decoded field by field as targets are extracted from it:
+    page_html = response.read()
+    
+    # Keep the session and, if requested, the credentials for later runs:
+    user_info = session_cache.save_session(cookie_jar, params, user_info)
+    if params.get('save-credentials',False) == True:
+        user_info = session_cache.save_credentials(params, user_info)
+    
+    # Extract the ASCII target information from the returned page, setting aside
+    # any malformed rows rather than abandoning the whole list: 
+    targets = parse_target_list_html(page_html, quarantine=quarantine)
+    for row in quarantine: row['source'] = 'online targetlist'
+    user_info = report_quarantine(quarantine, user_info, 'online targetlist')
+    if len(targets) == 0 and len(quarantine) > 0:
+        user_info.append('ERROR: No valid targets found in online targetlist')
+        status = False
+        return targets, user_info, status, quarantine
     user_info.append('Source of targets: online targetlist')
     
-    return targets, user_info, status
+    return targets, user_info, status, quarantine
     
 #################################
 # OUTPUT TARGET LIST TO LOCAL FILE
-def output_local_target_list(targets,file_path):
-    '''Function to output the target dictionary to a file on local disk. 
+def output_local_target_list(targets,file_path,kept_lines=None):
+    '''Function to output the target dictionary to a file on local disk, followed by
+    any kept_lines, which are written unchanged.
     This function will overwrite any existing file at file_path.
     '''
     
     fileobj = open(file_path,'w')
     for target_name,target in targets.items(): fileobj.write(target.summary() + '\n')
+    if kept_lines != None:
+        for line in kept_lines: fileobj.write(line.rstrip('\n') + '\n')
+    fileobj.close()
+    
+#################################
+# READ HISTORY ENTRIES OF QUARANTINED TARGETS
+def read_history_entries(quarantine, targets, file_path):
+    '''Function to return the lines of the history file at file_path which hold the
+    previous entries of targets whose rows were quarantined from the online targetlist,
+    so that the last good copy of these targets is kept when the file is rewritten.
+    Targets which were also read successfully are not included.'''
+    
+    kept_lines = []
+    names = set()
+    for row in quarantine:
+        fields = row['entry'].split()
+        if len(fields) > 0 and fields[0] not in targets: names.add(fields[0])
+    if len(names) == 0 or path.isfile(file_path) == False: return kept_lines
+    
+    fileobj = open(file_path,'r')
+    for line in fileobj:
+        fields = line.split()
+        if len(fields) > 0 and fields[0] in names: kept_lines.append(line)
     fileobj.close()
     
+    return kept_lines
+    
 
 #################################
 # READ TARGET LIST FROM LOCAL FILE
-def read_local_target_list(targets,user_info,params):
-    '''This function returns a target dictionary read from an input file on local disk.'''
+def read_local_target_list(targets,user_info,params,quarantine=None):
+    '''This function returns a target dictionary read from an input file on local disk.
+    Malformed rows are skipped and, if a list is given as quarantine, appended to it as
+    described in quarantine_row.'''
     
     # Initialise status:
     status = True
@@ -180,106 +252,165 @@ def read_local_target_list(targets,user_info,params):
     # Check we can find the file:
     if params['history'] == None:
         user_info.append('ERROR: No history file specified')
-	status = False
-	return targets, user_info, status
+        status = False
+        return targets, user_info, status
     if path.isfile(params['history']) == False:
          user_info.append('ERROR: Cannot find local target file '+params['history'])
-	 status = False
+         status = False
          return targets, user_info, status
     
     # Read and parse the input file:
     fileobj = open(params['history'],'r')
     file_lines = fileobj.readlines()
     fileobj.close()
-    for line in file_lines:
+    if quarantine == None: quarantine = []
+    for i,line in enumerate(file_lines):
         if line.lstrip()[0:1] != '#':
             target = target_class.MulensTarget()
-	    target.set_params(line)
-	    targets[target.short_name] = target
+            try: target.set_params(line)
+            except (IndexError, ValueError, TypeError) as error:
+                row = quarantine_row(i+1, line, error)
+                row['source'] = str(params['history'])
+                quarantine.append( row )
+                continue
+            targets[target.short_name] = target
+    user_info = report_quarantine(quarantine, user_info, str(params['history']))
     user_info.append('Source of targets: '+str(params['history']))
     
     return targets, user_info, status
     
+#################################
+# QUARANTINE A MALFORMED ROW
+def quarantine_row(line_number, entry, error, diagnostic=None):
+    '''Function to describe a row of the target list which could not be parsed, returning
+    a dictionary of the form:
+    { 'line': <line number in the page or file>,
+      'entry': <the row, as a string>,
+      'error': <diagnostic message> }
+    The callers which read the online targetlist and the history file add a 'source' 
+    entry, naming which of these the row came from.
+    '''
+    
+    if isinstance(entry, bytes): entry = entry.decode('utf-8','replace')
+    
+    # Unless already known, diagnose the row against the target schema.  This is only 
+    # done for rows which have already failed, so costs nothing for the rows which parse cleanly:
+    if diagnostic == None: diagnostic = target_class.MulensTarget().check_entry(entry)
+    if diagnostic == None: diagnostic = error.__class__.__name__ + ': ' + str(error)
+    
+    return { 'line': line_number, 'entry': entry.strip(), 'error': diagnostic }
+
+#################################
+# REPORT QUARANTINED ROWS
+def report_quarantine(quarantine, user_info, source):
+    '''Function to report in user_info any malformed rows set aside while reading the 
+    target list from source'''
+    
+    if len(quarantine) == 0: return user_info
+    
+    user_info.append('WARNING: Skipped '+str(len(quarantine))+' malformed row(s) in '+source)
+    for row in quarantine:
+        user_info.append('  line '+str(row['line'])+': '+row['error'])
+    
+    return user_info
+
+#################################
+# OUTPUT QUARANTINED ROWS TO LOCAL FILE
+def output_quarantine(quarantine, file_path, user_info):
+    '''Function to output the malformed rows set aside during a run to a file on local
+    disk, each preceded by a comment line giving its source, line number and diagnostic.
+    This function will overwrite any existing file at file_path, so that it always 
+    describes the latest run, and is empty if that run had no malformed rows.
+    '''
+    
+    fileobj = open(file_path,'w')
+    for row in quarantine: 
+        fileobj.write('# '+row.get('source','target list')+' line '+str(row['line'])+': '+row['error']+'\n')
+        fileobj.write(row['entry']+'\n')
+    fileobj.close()
+    if len(quarantine) > 0: user_info.append('Malformed rows written to '+str(file_path))
+    
+    return user_info
+
 #################################
 # PARSE THE TARGET LIST TABLE
-def parse_target_list_html(page_html):
+def parse_target_list_html(page_html, quarantine=None):
     '''Function to extract the information from the target list HTML table. 
     Although there are number of HTML-parsing libraries out there for this purpose, this is 
-    written explicitly to avoid introducing a dependency requirement for users.'''
-    
-    # Functions to parse specific lines in the table:
-    def parse_header_line(line):
-        entry = line.replace('</th><th>',' ').replace('<th>',' ').replace('</th>',' ')
-	entry = entry.replace('colspan="3"','').replace('colspan="2"','').replace('align="middle"','')
-        entry = entry.replace('<th >',' ').replace('<th  >',' ')
-	entry = entry.replace('<sub>','_').replace('</sub>','').replace('\n','')
-	if entry[0:1] == '+': entry = entry[1:]
-	entry = entry.lstrip()
-	return entry
+    written explicitly to avoid introducing a dependency requirement for users.
+    
+    The page is given as the bytes of the portal's response.  Lines are located by their
+    offsets within this buffer, so only the rows of the target table itself are ever
+    copied out of it, and these are never decoded as a whole: MulensTarget.set_params
+    decodes only the fields it stores as strings.
+    
+    By default, a malformed row raises an IndexError, ValueError or TypeError.  If a list
+    is given as quarantine, each malformed row is instead appended to it, as described in
+    quarantine_row, and parsing continues with the next row.'''
     
+    # Function to parse a content line of the table:
     def parse_content_line(line):
-        entry = line.replace('<tr>','').replace('</tr>','').replace('\n','')
-	entry = entry.replace('<td></td>','    ')
-	entry = entry.replace('</td><td>',' ').replace('<td>','').replace('<b>','').replace('</b>','')
-	entry = entry.replace('</td>','').replace('&','').replace(';','_').replace('<br>',':')
-	
-	if '<a href' in entry:
-	    i0 = line.index('<a href')
-	    i1 = line.index('</a>')
-	    i1 = line[i0:i1].index('>') + 1
-	    entry = entry[i1:].replace('</a>',' ')
-	#entry = entry.lstrip()
-	
-	return entry
-    
-    
-    # Initialise target dictionary:
-    targets = {}
+        entry = line.replace(b'<tr>',b'').replace(b'</tr>',b'').replace(b'\n',b'')
+        entry = entry.replace(b'<td></td>',b'    ')
+        entry = entry.replace(b'</td><td>',b' ').replace(b'<td>',b'').replace(b'<b>',b'').replace(b'</b>',b'')
+        entry = entry.replace(b'</td>',b'').replace(b'&',b'').replace(b';',b'_').replace(b'<br>',b':')
+        
+        if b'<a href' in entry:
+            i0 = line.index(b'<a href')
+            i1 = line.index(b'</a>')
+            i1 = line[i0:i1].index(b'>') + 1
+            entry = entry[i1:].replace(b'</a>',b' ')
+        
+        return entry
     
-    # Loop over each line of the returned HTML table.  The start and end of the target list
-    # is indicated by the tags >>>>START TARGET LIST '  ' <<<<END TARGET LIST'
-    table_headers = ['']
-    table_entries = []
-    in_table = False
-    for line in page_html:
-	
-	# Identify the start and end of the target table (distinguishing it from the other
-	# tables used in the page formatting).  At these flags, switch on and off the 
-	# recording of data:
-	
-        if in_table == False and 'START TARGET LIST' in line:
-	    in_table = True
-	if in_table == True and 'END TARGET LIST' in line:
-	    in_table = False
-	
-	# Parse table content:
-	if in_table == True:
-	    
-	    # Distinguish between header and table entry information. 
-	    # The first line of the table header is written in several sections, which
-	    # need to be concatenated this way.  
-	    if '<th' in line:table_headers[0] = table_headers[0] + parse_header_line(line)
-	
-	    # The second line of the table isn't marked as a header but contains more info
-	    # on the column divisions:
-	    if 'recommended' in line: table_headers.append( parse_content_line(line) )
-	        
-	    # Any other line containing at least one <td> is a content line, but
-	    # for ASCII output we need to exclude lines containing graphics:
-	    else:
-	        if '<td>' in line and 'img src' not in line and 'form' not in line: 
-		    entry = parse_content_line(line)
-		    if len(entry.replace(' ','').replace('\t','')) > 0: 
-		        target = target_class.MulensTarget()
-		        target.set_params(entry)
-		        targets[target.short_name] = target
-			
-    # Compile the table data:
-    # Note this is now no longer returned; code may be removed anon. depending on how useage 
-    # develops. 
-    table_data = ''
-    for hdr in table_headers: table_data = table_data + '# ' + hdr + '\n'
-    for entry in table_entries:  table_data = table_data + entry + '\n'
+    # Initialise target dictionary.  The line numbers of any malformed rows are counted
+    # only as far as needed, from the last malformed row onwards:
+    targets = {}
+    line_number = 1
+    counted_to = 0
+    
+    # The start and end of the target list are indicated by the tags 
+    # >>>>START TARGET LIST and <<<<END TARGET LIST, distinguishing it from the other
+    # tables used in the page formatting.  Rather than splitting the whole page into
+    # lines, locate each table within the buffer and scan only its lines:
+    flag = page_html.find(b'START TARGET LIST')
+    while flag != -1:
+        i = page_html.rfind(b'\n', 0, flag) + 1
+        end_flag = page_html.find(b'END TARGET LIST', flag)
+        if end_flag == -1: end_flag = len(page_html)
+        table_end = page_html.rfind(b'\n', 0, end_flag) + 1
+        
+        # Loop over each line of the table, identified by its offsets [i,j):
+        while i < table_end:
+            j = page_html.find(b'\n', i, table_end) + 1
+            if j == 0: j = table_end
+            
+            # The second line of the table isn't marked as a header but contains more info
+            # on the column divisions.  Any other line containing at least one <td> is a 
+            # content line, but for ASCII output we need to exclude lines containing graphics:
+            if page_html.find(b'<td>', i, j) != -1 and \
+                page_html.find(b'recommended', i, j) == -1 and \
+                page_html.find(b'img src', i, j) == -1 and \
+                page_html.find(b'form', i, j) == -1:
+                try:
+                    entry = None
+                    entry = parse_content_line(page_html[i:j])
+                    if len(entry.strip()) > 0: 
+                        target = target_class.MulensTarget()
+                        target.set_params(entry)
+                        targets[target.short_name] = target
+                except (IndexError, ValueError, TypeError) as error:
+                    if quarantine == None: raise
+                    line_number = line_number + page_html.count(b'\n', counted_to, i)
+                    counted_to = i
+                    if entry == None:
+                        quarantine.append( quarantine_row(line_number, page_html[i:j], error, \
+                                            diagnostic='Malformed HTML in table row') )
+                    else:
+                        quarantine.append( quarantine_row(line_number, entry, error) )
+            i = j
+        
+        flag = page_html.find(b'START TARGET LIST', end_flag)
     
     return targets
 
@@ -292,74 +423,79 @@ def parse_cl_args():
     params = { 'userID': None,
                'password': None,
                'output_file': None,
-	       'targets-only': False,
-	       'history': None }
+               'targets-only': False,
+               'history': None,
+               'offline': False,
+               'save-credentials': False,
+               'cache_dir': session_cache.default_cache_dir,
+               'quarantine': None }
 
+    # Index the argument list once, rather than re-scanning argv for each flag:
+    arg_index = {}
+    for i,arg in enumerate(argv): arg_index.setdefault(arg,i)
+    
     # First check for help or version, since these just result in screen output:
-    if '-help' in argv:
-        print help_text
-	exit()
-    if '-version' in argv:    
-        print version
-	exit()
+    if '-help' in arg_index:
+        print(help_text)
+        exit()
+    if '-version' in arg_index:    
+        print(version)
+        exit()
     
     # Next search for user authentication, since this requires two arguments and
     # needs to prompt for either one being missing:
-    if '-user' in argv:
-        i = argv.index('-user')
-	try: params['userID'] = argv[i+1]
-        except IndexError:
-	    print 'ERROR: missing username in argument list'
-	    exit()
-	    
-	try:
-	    i = argv.index('-pass')
-	    try: params['password'] = argv[i+1]
-            except IndexError:
-	        print 'ERROR: missing password in argument list'
-	        exit()
-        except ValueError:
-	    print 'ERROR: missing password in argument list'
-	    exit()
-	 
-    if '-pass' in argv:
-        i = argv.index('-pass')
-	try: params['password'] = argv[i+1]
+    if '-user' in arg_index or '-pass' in arg_index:
+        if '-user' not in arg_index or arg_index['-user']+1 >= len(argv):
+            print('ERROR: missing username in argument list')
+            exit()
+        if '-pass' not in arg_index or arg_index['-pass']+1 >= len(argv):
+            print('ERROR: missing password in argument list')
+            exit()
+        params['userID'] = argv[arg_index['-user']+1]
+        params['password'] = argv[arg_index['-pass']+1]
+
+    # ...and whether to keep them in the credential cache, and where that is:
+    if '-save-credentials' in arg_index: params['save-credentials'] = True
+    if '-cache-dir' in arg_index:
+        try:
+             params['cache_dir'] = argv[arg_index['-cache-dir']+1]
         except IndexError:
-	    print 'ERROR: missing password in argument list'
-	    exit()
-        
-	try:
-	    i = argv.index('-user')
-	    try: params['userID'] = argv[i+1]
-            except IndexError:
-	        print 'ERROR: missing username in argument list'
-	        exit()
-        except ValueError:
-	    print 'ERROR: missing username in argument list'
-	    exit()   
+            print('ERROR: missing cache directory in argument list')
+            exit() 
 
     # Now check for an output file name:
-    if '-file' in argv:
-        i = argv.index('-file')
-	try:
-	     params['output_file'] = argv[i+1]
+    if '-file' in arg_index:
+        try:
+             params['output_file'] = argv[arg_index['-file']+1]
         except IndexError:
-	    print 'ERROR: missing output filename in argument list'
-	    exit() 
+            print('ERROR: missing output filename in argument list')
+            exit() 
     
-    # Now check for an output file name:
-    if '-history' in argv:
-        i = argv.index('-history')
-	try:
-	     params['history'] = argv[i+1]
+    # Now check for a target list history file name:
+    if '-history' in arg_index:
+        try:
+             params['history'] = argv[arg_index['-history']+1]
+        except IndexError:
+            print('ERROR: missing target list history filename in argument list')
+            exit() 
+            
+    # Now check for a file to record malformed rows to:
+    if '-quarantine' in arg_index:
+        try:
+             params['quarantine'] = argv[arg_index['-quarantine']+1]
         except IndexError:
-	    print 'ERROR: missing target list history filename in argument list'
-	    exit() 
-	    
+            print('ERROR: missing quarantine filename in argument list')
+            exit() 
+            
     # ...and check for no output option (returns target dictionary only):
-    if '-targets-only' in argv: params['targets-only'] = True
+    if '-targets-only' in arg_index: params['targets-only'] = True
     
+    # Offline mode reads the history file only, and requires one to be given:
+    if '-offline' in arg_index:
+        if params['history'] == None:
+            print('ERROR: -offline requires a -history file')
+            exit()
+        params['offline'] = True
     
     return params
     
@@ -375,4 +511,4 @@ if __name__ == '__main__':
     (target_dict, user_info) = request_target_list(params)
     
     # Output info statements:
-    for line in user_info: print line
+    for line in user_info: print(line)
@@ -0,0 +1,268 @@
+###################################################################################
+#                       SESSION CACHE
+#
+# Local store of portal credentials and authenticated session cookies, so that
+# repeated and unattended runs need neither an interactive prompt nor a fresh
+# login to the Spitzer Microlensing portal.
+# Author:
+#    Rachel Street @ LCOGT
+###################################################################################
+
+########################
+# IMPORTED MODULES
+# The HTTP stack (urllib.request, http.cookiejar), getpass, json, stat and time 
+# are imported only in the functions which use them, so that importing this 
+# module stays cheap:
+from os import path, environ
+import os
+import sys
+
+########################
+# DECLARED STATEMENTS
+# Default location of the cache, which is created readable by the user only:
+default_cache_dir = path.join(path.expanduser('~'), '.spitzer_mulens')
+
+# Environment variables which may hold the portal credentials for unattended runs:
+user_env_var = 'SPITZER_MULENS_USER'
+password_env_var = 'SPITZER_MULENS_PASSWORD'
+
+# Lifetimes of cached credentials and of an authenticated session, in seconds:
+credential_lifetime = 30.0 * 24.0 * 3600.0
+session_lifetime = 8.0 * 3600.0
+
+#################################
+# GET CREDENTIALS
+def get_credentials(params, user_info):
+    '''Function to complete the userID and password entries of the params dictionary.
+
+    Credentials are taken, in order of preference, from the params dictionary itself,
+    the SPITZER_MULENS_USER and SPITZER_MULENS_PASSWORD environment variables, the
+    credential cache and, only if the program is run from a terminal, an interactive
+    prompt.  Unattended runs never block waiting on a prompt; instead an error is
+    appended to user_info and the status returned is False.
+    
+    The source of the password is recorded in params['credential_source'], as one of
+    'params', 'environment', 'cache' or 'prompt', so that a cached password which the
+    portal rejects can be discarded.
+    '''
+
+    import time
+
+    # Initialise status:
+    status = True
+
+    if params['password'] != None: params['credential_source'] = 'params'
+
+    if params['userID'] == None: params['userID'] = environ.get(user_env_var)
+    if params['password'] == None: 
+        params['password'] = environ.get(password_env_var)
+        if params['password'] != None: params['credential_source'] = 'environment'
+
+    if params['password'] == None:
+        cached = read_cache_file(params, 'credentials', user_info)
+        if cached != None and cached.get('expires',0.0) > time.time() and \
+            params['userID'] in [ None, cached.get('userID') ]:
+            params['userID'] = cached['userID']
+            params['password'] = cached['password']
+            params['credential_source'] = 'cache'
+
+    if params['userID'] == None or params['password'] == None:
+        if sys.stdin == None or sys.stdin.isatty() == False:
+            user_info.append('ERROR: No portal credentials given and no terminal to prompt for them')
+            status = False
+            return user_info, status
+        if params['userID'] == None: params['userID'] = input('Username: ')
+        if params['password'] == None:
+            import getpass
+            params['password'] = getpass.getpass('Password: ')
+            params['credential_source'] = 'prompt'
+
+    return user_info, status
+
+#################################
+# SAVE CREDENTIALS
+def save_credentials(params, user_info):
+    '''Function to record the userID and password given in params to the credential
+    cache, from which they will be re-used until they expire.  Note that the password
+    is stored as plain text, protected only by the file being readable by the user alone.'''
+
+    import time
+    import json
+
+    record = { 'userID': params['userID'],
+               'password': params['password'],
+               'expires': time.time() + credential_lifetime }
+    write_cache_file(params, 'credentials', json.dumps(record), user_info)
+
+    return user_info
+
+#################################
+# OPEN SESSION
+def open_session(url, params, user_info):
+    '''Function to build a URL opener for the portal, returning the opener, its
+    cookie jar, user_info and a status flag.
+
+    The opener sends the HTTP Basic authentication header with every request, rather
+    than waiting to be challenged for it, and carries any session cookies cached from
+    an earlier run.  If the cached session for this user has not yet expired, the
+    login request is skipped entirely.  Otherwise the login request is made and, if
+    successful, recorded as a new session.
+    '''
+
+    # Deferred imports, so that only runs which query the portal load the HTTP stack:
+    import urllib.request
+    import urllib.error
+    import http.cookiejar
+    import time
+    import json
+
+    # Status flag, indicates success or failure of the login:
+    status = True
+
+    # Build the password manager.  Yes, this uses urllib rather than requests
+    # This is to make the code as portable as possible for users for whom
+    # requests isn't yet part of their system python, and to avoid having
+    # any dependencies if possible:
+    pswd_mgr = urllib.request.HTTPPasswordMgrWithPriorAuth()
+    pswd_mgr.add_password(None, url, params['userID'], params['password'], is_authenticated=True)
+    auth_handler = urllib.request.HTTPBasicAuthHandler(pswd_mgr)
+
+    # Load any session cookies cached from an earlier run:
+    cookie_jar = http.cookiejar.LWPCookieJar()
+    cookie_file = cache_file_path(params, 'cookies')
+    session = read_cache_file(params, 'session', user_info)
+    session_valid = session != None and session.get('userID') == params['userID'] and \
+                        session.get('expires',0.0) > time.time()
+    if session_valid and cookie_file != None and path.isfile(cookie_file):
+        try: cookie_jar.load(cookie_file, ignore_discard=True)
+        except (IOError, http.cookiejar.LoadError):
+            user_info.append('WARNING: Could not read cached session cookies from '+cookie_file)
+    cookie_handler = urllib.request.HTTPCookieProcessor(cookie_jar)
+
+    opener = urllib.request.build_opener(auth_handler, cookie_handler)
+
+    # Install the opener:
+    urllib.request.install_opener(opener)
+    if session_valid:
+        user_info.append('Re-using Spitzer microlensing observing portal session for '+str(params['userID']))
+        return opener, cookie_jar, user_info, status
+
+    try: response = opener.open(url)
+    except urllib.error.HTTPError as error:
+        user_info.append('Problem logging into Spitzer microlensing observing portal: ' + str(error.reason))
+        if error.code == 401: user_info = reject_credentials(params, user_info)
+        status = False
+        return opener, cookie_jar, user_info, status
+    user_info.append('Logged into Spitzer microlensing observing portal as '+str(params['userID']))
+
+    record = { 'userID': params['userID'], 'expires': time.time() + session_lifetime }
+    write_cache_file(params, 'session', json.dumps(record), user_info)
+    save_session(cookie_jar, params, user_info)
+
+    return opener, cookie_jar, user_info, status
+
+#################################
+# SAVE SESSION
+def save_session(cookie_jar, params, user_info):
+    '''Function to record the session cookies held by cookie_jar in the cache'''
+
+    cookie_file = cache_file_path(params, 'cookies')
+    if cookie_file == None: return user_info
+
+    # Create the file readable by the user only before the cookie jar writes to it:
+    if write_cache_file(params, 'cookies', '', user_info) == True:
+        cookie_jar.save(cookie_file, ignore_discard=True)
+
+    return user_info
+
+#################################
+# CLEAR SESSION
+def clear_session(params):
+    '''Function to discard the cached session, for example after the portal has
+    rejected it, so that the next run logs in afresh'''
+
+    for name in [ 'session', 'cookies' ]:
+        file_path = cache_file_path(params, name)
+        if file_path != None and path.isfile(file_path): os.remove(file_path)
+
+#################################
+# CLEAR CREDENTIALS
+def clear_credentials(params):
+    '''Function to discard the cached credentials'''
+
+    file_path = cache_file_path(params, 'credentials')
+    if file_path != None and path.isfile(file_path): os.remove(file_path)
+
+#################################
+# REJECT CREDENTIALS
+def reject_credentials(params, user_info):
+    '''Function to handle the portal rejecting the credentials with a 401 response.
+    The cached session is always discarded and, if the password was taken from the 
+    credential cache, so are the cached credentials, so that later unattended runs 
+    do not keep retrying a password which has since been changed.'''
+
+    clear_session(params)
+    if params.get('credential_source') == 'cache':
+        clear_credentials(params)
+        user_info.append('WARNING: Removed cached credentials rejected by the portal')
+
+    return user_info
+
+#################################
+# CACHE FILE PATH
+def cache_file_path(params, name):
+    '''Function to return the path to a file in the cache directory, or None if
+    caching has been switched off by setting params['cache_dir'] = None'''
+
+    cache_dir = params.get('cache_dir', default_cache_dir)
+    if cache_dir == None: return None
+
+    return path.join(cache_dir, name)
+
+#################################
+# READ CACHE FILE
+def read_cache_file(params, name, user_info):
+    '''Function to return the dictionary recorded in a file in the cache, or None if
+    there is no such file.  Files which are readable by other users are ignored.'''
+
+    import stat
+    import json
+
+    file_path = cache_file_path(params, name)
+    if file_path == None or path.isfile(file_path) == False: return None
+
+    if os.stat(file_path).st_mode & (stat.S_IRWXG | stat.S_IRWXO) != 0:
+        user_info.append('WARNING: Ignoring cache file '+file_path+' since it is readable by other users')
+        return None
+
+    try:
+        fileobj = open(file_path,'r')
+        record = json.load(fileobj)
+        fileobj.close()
+    except (IOError, ValueError):
+        user_info.append('WARNING: Could not read cache file '+file_path)
+        return None
+
+    return record
+
+#################################
+# WRITE CACHE FILE
+def write_cache_file(params, name, content, user_info):
+    '''Function to write content to a file in the cache, creating the cache directory
+    and file so that only the user can read them.  Returns True if successful.'''
+
+    file_path = cache_file_path(params, name)
+    if file_path == None: return False
+
+    try:
+        if path.isdir(path.dirname(file_path)) == False: os.makedirs(path.dirname(file_path), 0o700)
+        fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.chmod(file_path, 0o600)
+        fileobj = os.fdopen(fd,'w')
+        fileobj.write(content)
+        fileobj.close()
+    except (IOError, OSError):
+        user_info.append('WARNING: Could not write cache file '+file_path)
+        return False
+
+    return True
@@ -1,5 +1,5 @@
 ###################################################################################
-#     	      	      	    SPITZER MICROLENSING TARGET CLASS
+#                           SPITZER MICROLENSING TARGET CLASS
 #
 # Definition of a Class of object describing a target in the Spitzer Microlensing Program
 # Author:
@@ -15,59 +15,98 @@ class MulensTarget:
     '''Class definition of a microlensing target selected for ground- and space-based simultaneous 
     observation with Spitzer'''
     
+    # Table columns, in order, and those of them which hold floating point values.
+    # These are shared by all instances rather than rebuilt for each target:
+    key_list = [ 'short_name', 'ra', 'dec', 'A0_survey', 't0_survey', 'tE_survey', 'mag_last', \
+                 'delta_t_last', 'mag_model', 'cadence_hrs', 'spitzer_priority', 'ground_priority', \
+                 'survey_cadence', 'observers_list' ]
+    float_keys = frozenset([ 'A0_survey', 'tE_survey', 'mag_last', 'delta_t_last', 'mag_model', 'cadence_hrs' ])
+    
     # Initialize:
     def __init__(self):
         '''Method to describe the initialization of a target in the Spitzer Microlensing Program'''
-	
-	self.name = None
-	self.short_name = None
+        
+        self.name = None
+        self.short_name = None
         self.ra = None
         self.dec = None
-	self.A0_survey = None
+        self.A0_survey = None
         self.t0_survey = None
-	self.u0_survey = None
-	self.tE_survey = None
-	self.mag_last = None
-	self.delta_t_last = None
+        self.u0_survey = None
+        self.tE_survey = None
+        self.mag_last = None
+        self.delta_t_last = None
         self.mag_model = None
         self.cadence_hrs = None
         self.spitzer_priority = None
         self.ground_priority = None
         self.observers_list = None
-	self.survey_cadence = None
-
-        self.key_list = [ 'short_name', 'ra', 'dec', 'A0_survey', 't0_survey', 'tE_survey', 'mag_last', \
-	             'delta_t_last', 'mag_model', 'cadence_hrs', 'spitzer_priority', 'ground_priority', \
-		     'survey_cadence', 'observers_list' ]
-        self.float_keys = [ 'A0_survey', 'tE_survey', 'mag_last', 'delta_t_last', 'mag_model', 'cadence_hrs' ]
-	
+        self.survey_cadence = None
+        
 
     # Set input parameters from table entry string:
     def set_params(self,entry):
         '''Method to set the parameters of this instance of the MulensTarget class from an
-	entry in the target list table.  The entry is given as a single string.
-	Format should be:
-	Name RA Dec A_0 t_0 t_E  Latest_mag Delta_t Model_mag Cadence[hrs] Spizter_priority Ground_priority Survey_visits Observers_list
-	
-	Where the Observers list is colon-separated.
-	'''
-	
-	# Catch any content-free input strings:
-	entry_list = entry.split()
-	if len(entry_list) > 0:
-	    
+        entry in the target list table.  The entry is given as a single string.
+        Format should be:
+        Name RA Dec A_0 t_0 t_E  Latest_mag Delta_t Model_mag Cadence[hrs] Spizter_priority Ground_priority Survey_visits Observers_list
+        
+        Where the Observers list is colon-separated.
+        
+        The entry may also be given as bytes, as sliced from the portal's response.  In this
+        case only the fields stored as strings are decoded, since float() accepts bytes directly.
+        '''
+        
+        # Catch any content-free input strings:
+        entry_list = entry.split()
+        if len(entry_list) > 0:
+            
+            is_bytes = isinstance(entry, bytes)
+            none_flag = b'none' if is_bytes else 'none'
+            float_keys = self.float_keys
             for i,key in enumerate(self.key_list):
-	    	if key in self.float_keys: 
-		    if 'none' in str(entry_list[i]).lower(): setattr(self,key,0.0)
-		    else: setattr(self,key,float(entry_list[i]))
-	    	else: setattr(self,key,entry_list[i])
-	    	if key == 'short_name': self.name = swapname_public.swapname_public(short_name=self.short_name)
+                value = entry_list[i]
+                if key in float_keys: 
+                    # Entries of 'None' are only checked for once float() has failed:
+                    try: value = float(value)
+                    except ValueError:
+                        if none_flag not in value.lower(): raise
+                        value = 0.0
+                elif is_bytes: value = value.decode('utf-8','replace')
+                setattr(self,key,value)
+                if key == 'short_name': self.name = swapname_public.swapname_public(short_name=self.short_name)
+
+    # Diagnose an entry which does not fit the table format:
+    def check_entry(self,entry):
+        '''Method to check an entry in the target list table against the format expected by
+        set_params, given in key_list.  Returns a diagnostic message describing the first
+        problem found, or None if the entry has no problem this method recognises.
+        This is intended to explain why set_params rejected an entry, rather than to be
+        run on every entry beforehand.
+        '''
+        
+        if isinstance(entry, bytes): entry = entry.decode('utf-8','replace')
+        entry_list = entry.split()
+        if len(entry_list) < len(self.key_list):
+            if len(entry_list) == 0: return 'Empty entry'
+            return 'Expected '+str(len(self.key_list))+' fields, found '+str(len(entry_list)) + \
+                    ' (first missing field: '+self.key_list[len(entry_list)]+')'
+        
+        for i,key in enumerate(self.key_list):
+            if key in self.float_keys and 'none' not in entry_list[i].lower():
+                try: float(entry_list[i])
+                except ValueError: return 'Invalid value for '+key+': '+repr(entry_list[i])
+        
+        try: swapname_public.swapname_public(short_name=entry_list[0])
+        except TypeError: return 'Unrecognised survey in event name: '+repr(entry_list[0])
+        
+        return None
 
     # Return summary string:
     def summary(self):
         '''Method to print a text summary of all parameters'''
-	
-	summary = ''
-	for key in self.key_list: summary = summary + ' ' + str(getattr(self,key))
+        
+        summary = ''
+        for key in self.key_list: summary = summary + ' ' + str(getattr(self,key))
         return summary
-	
+        
@@ -0,0 +1,108 @@
+###################################################################################
+#                       TEST HISTORY
+#
+# Checks that reading and rewriting the -history file never loses target rows.
+# Run with:
+#    > python3 -m pytest test_history.py
+###################################################################################
+
+########################
+# IMPORTED MODULES
+import get_spitzer_mulens_targets
+
+good_rows = [ ' OB160001 17:51:40.00 -29:53:40.0 5.0 7500.000 20.0 15.0 0.5 16.0 4.0 high low 2 LCOGT:uFUN\n',
+              ' OB160002 17:51:41.00 -29:53:41.0 6.0 7501.000 21.0 16.0 0.5 16.0 4.0 high low 2 LCOGT:uFUN\n',
+              ' OB160003 17:51:42.00 -29:53:42.0 6.0 7502.000 22.0 17.0 0.5 16.0 4.0 high low 2 LCOGT:uFUN\n' ]
+
+def make_params(tmp_path, history_lines):
+    '''Function to write a history file and return the params for reading it'''
+
+    history_file = tmp_path / 'history.txt'
+    history_file.write_text(''.join(history_lines))
+    params = { 'userID': None, 'password': None, 'output_file': None, 'targets-only': True,
+               'history': str(history_file), 'offline': True, 'quarantine': None, 'cache_dir': None }
+
+    return params
+
+def test_history_read_leaves_file_unchanged(tmp_path):
+    '''A history read which quarantines a row must not rewrite the history file'''
+
+    history_lines = good_rows[0:2] + [ ' OB160004 17:51:43.00 -29:53:43.0\n' ] + good_rows[2:]
+    params = make_params(tmp_path, history_lines)
+
+    (targets, user_info) = get_spitzer_mulens_targets.request_target_list(params)
+
+    assert sorted(targets.keys()) == [ 'OB160001', 'OB160002', 'OB160003' ]
+    assert open(params['history']).readlines() == history_lines
+
+def test_online_quarantine_keeps_previous_history_entry(tmp_path, monkeypatch):
+    '''A target whose online row is quarantined keeps its previous history entry'''
+
+    params = make_params(tmp_path, good_rows)
+    params['offline'] = False
+    params['userID'] = 'user'
+    params['password'] = 'pass'
+
+    page_html = b'\n'.join([ b'<!-- >>>>START TARGET LIST -->',
+        b'<tr><td>OB160001</td><td>17:51:40.00</td><td>-29:53:40.0</td><td>5.0</td><td>7500.000</td>' + \
+        b'<td>20.0</td><td>15.0</td><td>0.5</td><td>16.0</td><td>4.0</td><td>high</td><td>low</td>' + \
+        b'<td>2</td><td>LCOGT</td></tr>',
+        b'<tr><td>OB160002</td><td>17:51:41.00</td></tr>',
+        b'<!-- <<<<END TARGET LIST -->', b'' ])
+
+    def fetch_page(targets, user_info, params):
+        quarantine = []
+        targets = get_spitzer_mulens_targets.parse_target_list_html(page_html, quarantine=quarantine)
+        return targets, user_info, True, quarantine
+    monkeypatch.setattr(get_spitzer_mulens_targets, 'fetch_online_targetlist', fetch_page)
+
+    (targets, user_info) = get_spitzer_mulens_targets.request_target_list(params)
+
+    assert sorted(targets.keys()) == [ 'OB160001' ]
+    history_lines = open(params['history']).readlines()
+    assert good_rows[1] in history_lines
+    assert good_rows[2] not in history_lines
+    assert len(history_lines) == 2
+
+def test_quarantine_file_keeps_online_and_history_rows(tmp_path, monkeypatch):
+    '''Malformed rows from both the online targetlist and the history fallback are
+    written to the quarantine file, each labelled with its source'''
+
+    history_lines = good_rows[0:1] + [ ' OB160004 17:51:43.00 -29:53:43.0\n' ]
+    params = make_params(tmp_path, history_lines)
+    params['offline'] = False
+    params['userID'] = 'user'
+    params['password'] = 'pass'
+    params['quarantine'] = str(tmp_path / 'quarantine.txt')
+
+    page_html = b'\n'.join([ b'<!-- >>>>START TARGET LIST -->',
+        b'<tr><td>OB160002</td><td>17:51:41.00</td></tr>',
+        b'<!-- <<<<END TARGET LIST -->', b'' ])
+
+    def fetch_page(targets, user_info, params):
+        quarantine = []
+        targets = get_spitzer_mulens_targets.parse_target_list_html(page_html, quarantine=quarantine)
+        for row in quarantine: row['source'] = 'online targetlist'
+        return targets, user_info, False, quarantine
+    monkeypatch.setattr(get_spitzer_mulens_targets, 'fetch_online_targetlist', fetch_page)
+
+    (targets, user_info) = get_spitzer_mulens_targets.request_target_list(params)
+
+    assert sorted(targets.keys()) == [ 'OB160001' ]
+    quarantine_lines = open(params['quarantine']).readlines()
+    assert quarantine_lines[0].startswith('# online targetlist line 2: ')
+    assert quarantine_lines[1] == 'OB160002 17:51:41.00\n'
+    assert quarantine_lines[2].startswith('# ' + params['history'] + ' line 2: ')
+    assert quarantine_lines[3] == 'OB160004 17:51:43.00 -29:53:43.0\n'
+
+def test_quarantine_file_replaced_by_clean_run(tmp_path):
+    '''A run with no malformed rows leaves an empty quarantine file, not a stale one'''
+
+    params = make_params(tmp_path, good_rows)
+    params['quarantine'] = str(tmp_path / 'quarantine.txt')
+    open(params['quarantine'],'w').write('# stale\nOB160009\n')
+
+    (targets, user_info) = get_spitzer_mulens_targets.request_target_list(params)
+
+    assert len(targets) == 3
+    assert open(params['quarantine']).read() == ''
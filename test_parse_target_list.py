@@ -0,0 +1,76 @@
+###################################################################################
+#                       TEST PARSE TARGET LIST
+#
+# Checks that malformed rows of the target list table are quarantined, with the
+# right line number and diagnostic, while the good rows are still returned.
+# Run with:
+#    > python3 -m pytest test_parse_target_list.py
+###################################################################################
+
+########################
+# IMPORTED MODULES
+import pytest
+import get_spitzer_mulens_targets
+
+def make_row(short_name, delta_t=b'0.5'):
+    '''Function to return a target table row in the format of the online portal'''
+
+    return b'<tr><td><a href="event.cgi?event=' + short_name + b'">' + short_name + b'</a></td>' + \
+           b'<td>17:51:40.00</td><td>-29:53:40.0</td><td>5.0</td><td>7500.000</td><td>20.0</td>' + \
+           b'<td>15.0</td><td>' + delta_t + b'</td><td>16.0</td><td>4.0</td><td><b>high</b></td>' + \
+           b'<td>low</td><td>2</td><td>LCOGT<br>uFUN</td></tr>'
+
+def make_page(blocks):
+    '''Function to return a page holding one target table for each list of rows in blocks'''
+
+    lines = [ b'<html><body>' ]
+    for rows in blocks:
+        lines = lines + [ b'<!-- >>>>START TARGET LIST -->', b'<table>' ] + rows + \
+                        [ b'</table>', b'<!-- <<<<END TARGET LIST -->', b'<p>Notes</p>' ]
+    lines = lines + [ b'</body></html>', b'' ]
+
+    return b'\n'.join(lines)
+
+# Malformed rows, each with the start of its expected diagnostic:
+bad_rows = [ (b'<tr><td>OB160010</td><td>17:51:40.00</td></tr>', 'Expected 14 fields, found 2'),
+             (make_row(b'OB160011', delta_t=b'n/a'), "Invalid value for delta_t_last: 'n/a'"),
+             (make_row(b'XB160012'), "Unrecognised survey in event name: 'XB160012'"),
+             (b'<tr><td><a href="event.cgi">OB160013</td><td>1.0</td></tr>', 'Malformed HTML in table row') ]
+
+def test_quarantine_records_each_malformed_row():
+    '''Each kind of malformed row is quarantined with its line and diagnostic'''
+
+    rows = [ make_row(b'OB160001') ] + [ row for (row, diagnostic) in bad_rows ] + [ make_row(b'OB160002') ]
+    page_html = make_page([ rows ])
+
+    quarantine = []
+    targets = get_spitzer_mulens_targets.parse_target_list_html(page_html, quarantine=quarantine)
+
+    assert sorted(targets.keys()) == [ 'OB160001', 'OB160002' ]
+    assert len(quarantine) == len(bad_rows)
+    for k,(row, diagnostic) in enumerate(bad_rows):
+        # Lines: <html>, START, <table>, OB160001, then the malformed rows
+        assert quarantine[k]['line'] == 5 + k
+        assert quarantine[k]['error'].startswith(diagnostic)
+
+def test_malformed_row_raises_without_quarantine():
+    '''Without a quarantine list, a malformed row still raises'''
+
+    for (row, diagnostic) in bad_rows:
+        page_html = make_page([ [ make_row(b'OB160001'), row ] ])
+        with pytest.raises((IndexError, ValueError, TypeError)):
+            get_spitzer_mulens_targets.parse_target_list_html(page_html)
+
+def test_quarantine_line_numbers_across_tables():
+    '''Line numbers count from the start of the page across several target tables'''
+
+    page_html = make_page([ [ make_row(b'OB160001'), bad_rows[0][0] ],
+                            [ bad_rows[1][0], make_row(b'OB160002'), bad_rows[2][0] ] ])
+    lines = page_html.split(b'\n')
+
+    quarantine = []
+    targets = get_spitzer_mulens_targets.parse_target_list_html(page_html, quarantine=quarantine)
+
+    assert sorted(targets.keys()) == [ 'OB160001', 'OB160002' ]
+    assert [ row['line'] for row in quarantine ] == [ lines.index(bad_rows[k][0]) + 1 for k in range(0,3,1) ]
+    assert [ row['line'] for row in quarantine ] == [ 5, 11, 13 ]
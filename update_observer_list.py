@@ -1,6 +1,6 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 ###############################################################################
-#     	      	      	UPDATE OBSERVER LIST
+#                       UPDATE OBSERVER LIST
 #
 # Purpose:
 #    To programmatically register or deregister that a given observer is observing 
@@ -11,14 +11,12 @@
 
 ###############################
 # IMPORTED MODULES
+# Network and prompting modules (urllib.request, getpass) are imported only
+# where they are used, so that help and version runs never load the HTTP stack:
 from os import path
 from sys import argv
-from urllib import urlencode
-import urllib2
-import cookielib
-import getpass
-import target_class
 import swapname_public
+import session_cache
 
 ###############################
 # DECLARED STATEMENTS
@@ -29,17 +27,27 @@ a given target with the Spitzer online target system.
 
 Operation:
     From the commandline, type:
-    > python update_observer_list.py [inputs]
+    > python3 update_observer_list.py [inputs]
     
 Inputs (all mandatory):
     -mode         can be either "add" or "remove"
     -observer_id  should be one of the recognised observers registered with the online portal.
     -target_id    should be the shorthand name of a target in the Spitzer target list. 
     -user [ID] -pass [code]  Requires both -user and -pass arguments to be given, followed by
-              the respective access codes.  These will be prompted for if not given. 
+              the respective access codes.  If not given, these are read from the 
+              SPITZER_MULENS_USER and SPITZER_MULENS_PASSWORD environment variables or the 
+              credential cache, and are only prompted for when run from a terminal. 
+
+Inputs (optional):
+    -save-credentials  Records the access codes in the credential cache, readable only by the
+              user, so that later runs need not give them.  Note that the password is stored as 
+              plain text (JSON), protected only by the file permissions, as for a .netrc file. 
+              Cached credentials expire after 30 days, or when the portal rejects them. 
+    -cache-dir [dir-path]  Directory of the credential and session cache, Default: ~/.spitzer_mulens
+              An authenticated session is re-used from the cache for up to 8 hours. 
 '''
 
-version = 'update_observer_list_v1.0'
+version = 'update_observer_list_v2.1'
 
 ################################
 # DRIVER FUNCTION
@@ -50,65 +58,67 @@ def update_observer_list(params):
     It takes as input a dictionary with the following parameters:
     params = { 'userID': <given or prompted for>,
                'password': <given or prompted for>,
-	       'observer_id': <given, must be recognized by Spitzer interface otherwise no action taken>,
-	       'object_list': <given, a list of target names in short-hand format, which 
-	                      are required to be present in the target list.  If not present, 
-			      no action will be taken.>
-	       'mode': <given> Either "add" or "remove" as a lower-case string. 
-	     }
+               'observer_id': <given, must be recognized by Spitzer interface otherwise no action taken>,
+               'object_list': <given, a list of target names in short-hand format, which 
+                              are required to be present in the target list.  If not present, 
+                              no action will be taken.>
+               'mode': <given> Either "add" or "remove" as a lower-case string. 
+               'save-credentials': {True,False, Default: False},
+               'cache_dir': <directory path, None to disable, Default: ~/.spitzer_mulens>
+             }
+    Credentials not given are looked up as described in session_cache.get_credentials, 
+    and are never prompted for unless the program is run from a terminal. 
     '''
 
     # Initialize response message, returned in all cases:
     user_info = []
     update_script_url = 'http://robonet.lcogt.net/cgi-bin/private/cgiwrap/robouser/update_observer_list.cgi'
     
+    # Deferred imports, so that the module itself loads without the HTTP stack:
+    from urllib.parse import urlencode
+    import urllib.request
+    import urllib.error
+    
     # Compose authentication details if not already available:
-    if params['userID'] == None: params['userID'] = raw_input('Username: ')
-    if params['password'] == None: params['password'] = getpass.getpass('Password: ')
-    values = { 'username' : params['userID'], 'password': params['password'] }
-    data = urlencode(values)
-    
-    # Build the password manager.  Yes, this uses urllib2 rather than requests
-    # This is to make the code as portable as possible for users for whom
-    # requests isn't yet part of their system python, and to avoid having 
-    # any dependencies if possible:
-    pswd_mgr = urllib2.HTTPPasswordMgrWithDefaultRealm()
-    pswd_mgr.add_password(None, update_script_url, params['userID'], params['password'])
-    handler = urllib2.HTTPBasicAuthHandler(pswd_mgr)
-    opener = urllib2.build_opener(handler)
-    
-    # Install the opener:
-    urllib2.install_opener(opener)
-    try: response = opener.open(update_script_url)
-    except urllib2.HTTPError, error:
-        user_info.append('Problem logging into Spitzer microlensing observing portal: ' + error.reason)
-	return user_info
-    user_info.append('Logged into Spitzer microlensing observing portal as '+str(params['userID']))
+    (user_info, status) = session_cache.get_credentials(params, user_info)
+    if status == False:
+        return user_info
+    
+    # Log in, or re-use a cached session:
+    (opener, cookie_jar, user_info, status) = session_cache.open_session(update_script_url, params, user_info)
+    if status == False:
+        return user_info
     
     # Looping over all targets in the object_list, submit the requested update 
     # for each object's observer list:
     for object in params['object_list']:
         
-	# Parse the name of the object into full-length format for disambiguity and form the event_name/
-	# mode combination needed for submission:
-	if len(object) < 10 and '-' not in object: full_name = swapname_public.swapname_public(short_name=object)
-	else: full_name = object
-	event_observer = full_name + '_' + params['observer_id']
-	
-	# Compose the submission to the online interface:
+        # Parse the name of the object into full-length format for disambiguity and form the event_name/
+        # mode combination needed for submission:
+        if len(object) < 10 and '-' not in object: full_name = swapname_public.swapname_public(short_name=object)
+        else: full_name = object
+        event_observer = full_name + '_' + params['observer_id']
+        
+        # Compose the submission to the online interface:
         form_data = { }
         if str(params['mode']).lower() == 'add': form_data['ADD_OBSERVER'] = event_observer
         if str(params['mode']).lower() == 'remove': form_data['DEL_OBSERVER'] = event_observer
-        data = urlencode(form_data)
-	
-	# Send the request to the online system and harvest the response:
-        req = urllib2.Request(update_script_url,data)
-        try: response = urllib2.urlopen(req)
-        except urllib2.HTTPError, error:
-            user_info.append('Problem updating observer list: ' + error.reason)
+        data = urlencode(form_data).encode('ascii')
+        
+        # Send the request to the online system and harvest the response:
+        req = urllib.request.Request(update_script_url,data)
+        try: response = urllib.request.urlopen(req)
+        except urllib.error.HTTPError as error:
+            user_info.append('Problem updating observer list: ' + str(error.reason))
+            if error.code == 401: user_info = session_cache.reject_credentials(params, user_info)
             return user_info
-        page_html = response.readlines()
-	user_info.append(parse_response(page_html))
+        page_html = response.read()
+        user_info.append(parse_response(page_html))
+    
+    # Keep the session and, if requested, the credentials for later runs:
+    user_info = session_cache.save_session(cookie_jar, params, user_info)
+    if params.get('save-credentials',False) == True:
+        user_info = session_cache.save_credentials(params, user_info)
     
     return user_info
 
@@ -120,12 +130,13 @@ def parse_response(page_html):
     # Default return message:
     return_message = 'ERROR: unexpected output encountered from online interface'
     
-    # Identify the relevant line in the HTML output:
-    for line in page_html:
-        if '<h3 style' in line and 'Observer' in line:
-	    i1 = line.index('Observer')
-	    i2 = line[i1:].index('<')
-	    return_message = line[i1:i1+i2]
+    # Identify the relevant line in the HTML output, which is given as the bytes
+    # of the response.  Only the message itself is decoded:
+    for line in page_html.splitlines():
+        if b'<h3 style' in line and b'Observer' in line:
+            i1 = line.index(b'Observer')
+            i2 = line[i1:].index(b'<')
+            return_message = line[i1:i1+i2].decode('utf-8','replace')
     
     return return_message
 
@@ -138,78 +149,67 @@ def parse_cl_args():
     params = { 'userID': None,
                'password': None,
                'observer_id': None,
-	       'object_list': [],
-	       'mode': None }
+               'object_list': [],
+               'mode': None,
+               'save-credentials': False,
+               'cache_dir': session_cache.default_cache_dir }
 
+    # Index the argument list once, rather than re-scanning argv for each flag:
+    arg_index = {}
+    for i,arg in enumerate(argv): arg_index.setdefault(arg,i)
+    
     # First check for help or version, since these just result in screen output:
-    if '-help' in argv:
-        print help_text
-	exit()
-    if '-version' in argv:    
-        print version
-	exit()
+    if '-help' in arg_index:
+        print(help_text)
+        exit()
+    if '-version' in arg_index:    
+        print(version)
+        exit()
     
     # Next search for user authentication, since this requires two arguments and
     # needs to prompt for either one being missing:
-    if '-user' in argv:
-        i = argv.index('-user')
-	try: params['userID'] = argv[i+1]
+    if '-user' in arg_index or '-pass' in arg_index:
+        if '-user' not in arg_index or arg_index['-user']+1 >= len(argv):
+            print('ERROR: missing username in argument list')
+            exit()
+        if '-pass' not in arg_index or arg_index['-pass']+1 >= len(argv):
+            print('ERROR: missing password in argument list')
+            exit()
+        params['userID'] = argv[arg_index['-user']+1]
+        params['password'] = argv[arg_index['-pass']+1]
+    
+    # ...and whether to keep them in the credential cache, and where that is:
+    if '-save-credentials' in arg_index: params['save-credentials'] = True
+    if '-cache-dir' in arg_index:
+        try:
+             params['cache_dir'] = argv[arg_index['-cache-dir']+1]
         except IndexError:
-	    print 'ERROR: missing username in argument list'
-	    exit()
-	    
-	try:
-	    i = argv.index('-pass')
-	    try: params['password'] = argv[i+1]
-            except IndexError:
-	        print 'ERROR: missing password in argument list'
-	        exit()
-        except ValueError:
-	    print 'ERROR: missing password in argument list'
-	    exit()
-	 
-    if '-pass' in argv:
-        i = argv.index('-pass')
-	try: params['password'] = argv[i+1]
-        except IndexError:
-	    print 'ERROR: missing password in argument list'
-	    exit()
-        
-	try:
-	    i = argv.index('-user')
-	    try: params['userID'] = argv[i+1]
-            except IndexError:
-	        print 'ERROR: missing username in argument list'
-	        exit()
-        except ValueError:
-	    print 'ERROR: missing username in argument list'
-	    exit()   
+            print('ERROR: missing cache directory in argument list')
+            exit() 
     
     # Check for the target to be updated:
-    if '-target_id' in argv:
-        i = argv.index('-target_id')				  
-        try:						      
-             params['object_list'].append(argv[i+1])
-        except IndexError:				      
-            print 'ERROR: missing target name from argument list'	      
-            exit()					      
+    if '-target_id' in arg_index:
+        try:
+             params['object_list'].append(argv[arg_index['-target_id']+1])
+        except IndexError:
+            print('ERROR: missing target name from argument list')
+            exit()
     else:
-    	print 'ERROR: no target given'  
-    	exit()  
+        print('ERROR: no target given')  
+        exit()  
 
     # Now check for the remaining arguments:
     req_args_list = [ '-mode', '-observer_id' ]
     for argument in req_args_list:
         par_name = argument.replace('-','')
-        if argument in argv:					  
-            i = argv.index(argument)				  
-            try:						  
-        	 params[par_name] = argv[i+1]			  
-            except IndexError:  				  
-        	print 'ERROR: missing ' + par_name + ' value from argument list'	  
-        	exit()  					  
+        if argument in arg_index:
+            try:
+                 params[par_name] = argv[arg_index[argument]+1]
+            except IndexError:
+                print('ERROR: missing ' + par_name + ' value from argument list')
+                exit()
         else:
-	    print 'ERROR: missing ' + par_name + ' from argument list'	  
+            print('ERROR: missing ' + par_name + ' from argument list')
             exit()  
     
     return params
@@ -226,5 +226,5 @@ if __name__ == '__main__':
     user_info = update_observer_list(params)
     
     # Output info statements:
-    for line in user_info: print line
+    for line in user_info: print(line)
 